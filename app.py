@@ -1,8 +1,11 @@
 import os
 import logging
 from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_caching import Cache
+from jinja2 import FileSystemBytecodeCache
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
@@ -15,9 +18,24 @@ class Base(DeclarativeBase):
     pass
 
 db = SQLAlchemy(model_class=Base)
+cache = Cache()
+
+
+class SessionInterface(SecureCookieSessionInterface):
+    # Flask-Login touches the session after every request, which would add
+    # Vary: Cookie and stop shared caches from reusing public responses
+    def save_session(self, app, session, response):
+        if response.cache_control.public and not session.modified:
+            session.accessed = False
+        super().save_session(app, session, response)
+
 
 # Create the app
 app = Flask(__name__)
+# Keep every compiled template for the process lifetime and persist the
+# bytecode so new workers skip parsing; auto-reload still follows debug mode
+app.jinja_options = {**app.jinja_options, 'cache_size': -1, 'bytecode_cache': FileSystemBytecodeCache()}
+app.session_interface = SessionInterface()
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
@@ -31,9 +49,15 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Configure upload folder
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+# Configure in-process page cache
+app.config['CACHE_TYPE'] = 'SimpleCache'
+app.config['CACHE_DEFAULT_TIMEOUT'] = 300
 
 # Initialize extensions
 db.init_app(app)
+cache.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'  # type: ignore
@@ -1,9 +1,13 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from app import db
 
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
@@ -22,10 +26,24 @@ class User(UserMixin, db.Model):
     validated_reports = db.relationship('Report', foreign_keys='Report.validated_by', backref='validator', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not self.password_hash:
+            return False
+        if self.password_hash.startswith('$argon2'):
+            try:
+                password_hasher.verify(self.password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+            if password_hasher.check_needs_rehash(self.password_hash):
+                self.set_password(password)
+            return True
+        # Legacy Werkzeug hash: upgrade it to Argon2 on a successful login
+        if check_password_hash(self.password_hash, password):
+            self.set_password(password)
+            return True
+        return False
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -57,5 +75,12 @@ class Report(db.Model):
     validated_at = db.Column(db.DateTime)
     validation_notes = db.Column(db.Text)
     
+    # Indexes backing the dashboard "latest reports" and status lookups
+    __table_args__ = (
+        db.Index('ix_report_user_created', user_id, created_at.desc()),
+        db.Index('ix_report_status_created', status, created_at.desc()),
+        db.Index('ix_report_created', created_at.desc()),
+    )
+    
     def __repr__(self):
         return f'<Report {self.title}>'
\ No newline at end of file
@@ -1,33 +1,98 @@
 import os
+import shutil
+import tempfile
 from datetime import datetime, timedelta
-from flask import render_template, request, redirect, url_for, flash, jsonify, current_app
-from flask_login import login_user, logout_user, current_user
+from flask import render_template, request, redirect, url_for, flash, current_app, stream_with_context, stream_template, session
+from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from werkzeug.security import generate_password_hash
-from app import app, db
+from app import app, db, cache
 from models import User, Report
-import uuid
+import hashlib
 import re
 import asyncio
 import json
+import orjson
 
 
-def allowed_file(filename):
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+# Compiled once so each report is scanned in a single pass
+_SUSPICIOUS_RE = re.compile(r'\b(?:fake|false|spam|test|dummy)\b', re.IGNORECASE)
+_AUTO_VALIDATE_SEVERITIES = frozenset({'high', 'critical'})
+
+ALLOWED_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif'})
+
+
+def skip_page_cache():
+    # Pages show the login state and flashed messages, so only cache the
+    # anonymous, message-free render
+    return current_user.is_authenticated or '_flashes' in session
+
+
+def upload_extension(filename: str) -> str | None:
+    """Return the lowercased extension (with dot) if it is allowed, else None."""
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if ext in ALLOWED_EXTENSIONS else None
+
+
+def parse_incident_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD form date; raise ValueError for anything else."""
+    # fromisoformat also accepts times and compact forms that strptime rejected
+    if len(value) != 10 or value[4] != '-' or value[7] != '-':
+        raise ValueError("Expected YYYY-MM-DD")
+    return datetime.fromisoformat(value)
+
+
+def save_upload(file, file_ext):
+    """Store an upload under its content hash and return the stored filename.
+
+    Identical photos map to the same name, so a resubmitted image is not
+    written again. New files are moved into place atomically.
+    """
+    digest = hashlib.file_digest(file.stream, lambda: hashlib.blake2b(digest_size=16))
+    filename = f"{digest.hexdigest()}{file_ext}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if os.path.exists(file_path):
+        return filename
+    file.stream.seek(0)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            try:
+                # Let the kernel copy the spooled upload without user-space buffers
+                src_fd = file.stream.fileno()
+                size = os.fstat(src_fd).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), src_fd, offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+            except (AttributeError, OSError):
+                # No os.sendfile (Windows), no file-to-file sendfile (macOS) or
+                # no descriptor: start over with a plain buffered copy
+                out.seek(0)
+                out.truncate()
+                file.stream.seek(0)
+                shutil.copyfileobj(file.stream, out, length=1024 * 1024)
+        # mkstemp creates files as 0600; match what file.save() used to produce
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return filename
 
 
 @app.route('/')
+@cache.cached(timeout=600, unless=skip_page_cache)
 def index():
     return render_template('index.html')
 
 
-@app.route("/dashboard")
-def ai_dashboard():
-    return render_template("dashboard.html")
-
-
 # Temporarily bypass login required for testing
 @app.route('/report')
 def report():
@@ -36,11 +101,13 @@ def report():
 
 # Temporarily bypass login required for testing
 @app.route('/how-it-works')
+@cache.cached(timeout=600, unless=skip_page_cache)
 def how_it_works():
     return render_template('how_it_works.html')
 
 
 @app.route('/about')
+@cache.cached(timeout=600, unless=skip_page_cache)
 def about():
     return render_template('about.html')
 
@@ -58,6 +125,8 @@ def login():
         user = User.query.filter_by(username=username).first()
 
         if user and user.check_password(password):
+            # Persist a rehashed password if check_password upgraded it
+            db.session.commit()
             login_user(user)
             flash(f'Welcome back, {user.full_name or user.username}!', 'success')
             next_page = request.args.get('next')
@@ -84,14 +153,6 @@ def register():
             flash('Please fill in all required fields.', 'error')
             return render_template('register.html')
 
-        if User.query.filter_by(username=username).first():
-            flash('Username already exists. Please choose another.', 'error')
-            return render_template('register.html')
-
-        if User.query.filter_by(email=email).first():
-            flash('Email already registered. Please use another email.', 'error')
-            return render_template('register.html')
-
         user = User()
         user.username = username
         user.email = email
@@ -102,8 +163,24 @@ def register():
         user.location = location
         user.set_password(password)
 
-        db.session.add(user)
-        db.session.commit()
+        # The unique indexes on username/email reject duplicates in the same
+        # round trip as the insert, without a check-then-insert race
+        try:
+            db.session.add(user)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            # psycopg exposes the violated constraint; SQLite only names the column
+            diag = getattr(e.orig, 'diag', None)
+            if diag is not None:
+                email_taken = diag.constraint_name == 'ix_user_email'
+            else:
+                email_taken = 'user.email' in str(e.orig)
+            if email_taken:
+                flash('Email already registered. Please use another email.', 'error')
+            else:
+                flash('Username already exists. Please choose another.', 'error')
+            return render_template('register.html')
 
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('login'))
@@ -120,34 +197,52 @@ def logout():
 
 # Updated /dashboard route to show recent and validated reports separately
 @app.route('/dashboard')
+@login_required
 def dashboard():
-    # Mock user for testing: set appropriate user id and type
-    class MockUser:
-        id = 1
-        user_type = 'authority'
-
-    global current_user
-    current_user = MockUser()
+    # Per-status totals for the stats cards; their sum is also the page total,
+    # so paginate() can skip its own COUNT query
+    user_status_counts = dict(
+        db.session.execute(
+            select(Report.status, func.count(Report.id))
+            .where(Report.user_id == current_user.id)
+            .group_by(Report.status)
+        ).all()
+    )
 
-    # Fetch the current user's reports, recent reports, and validated reports
-    user_reports = Report.query.filter_by(user_id=current_user.id).order_by(Report.created_at.desc()).all()
+    page = request.args.get('page', 1, type=int)
+    user_pagination = Report.query.filter_by(user_id=current_user.id).order_by(
+        Report.created_at.desc()
+    ).paginate(page=page, per_page=12, error_out=False, count=False)
+    user_pagination.total = sum(user_status_counts.values())
+    user_reports = user_pagination.items
+    # Recent Activity always shows the latest 5, whichever page is open
+    if page == 1:
+        recent_user_reports = user_reports[:5]
+    else:
+        recent_user_reports = Report.query.filter_by(user_id=current_user.id).order_by(
+            Report.created_at.desc()
+        ).limit(5).all()
 
-    # Get recent reports (latest 10)
-    recent_reports = Report.query.order_by(Report.created_at.desc()).limit(10).all()
+    # Authorities see the latest 50, everyone else only the 10 most recent,
+    # which are a prefix of the same rows
+    latest_reports = Report.query.options(joinedload(Report.reporter)).order_by(
+        Report.created_at.desc()
+    ).limit(50 if current_user.user_type == 'authority' else 10).all()
+    recent_reports = latest_reports[:10]
 
     # Get validated reports (status = 'auto_validated', latest 10)
     validated_reports = Report.query.filter_by(status='auto_validated').order_by(Report.created_at.desc()).limit(10).all()
 
     # For authority users, show all reports (recent 50)
-    if current_user.user_type == 'authority':
-        all_reports = Report.query.order_by(Report.created_at.desc()).limit(50).all()
-    else:
-        all_reports = []
+    all_reports = latest_reports if current_user.user_type == 'authority' else []
 
     # Pass all needed lists into the template
     return render_template(
         'dashboard.html', 
         user_reports=user_reports, 
+        recent_user_reports=recent_user_reports,
+        user_pagination=user_pagination,
+        user_status_counts=user_status_counts,
         all_reports=all_reports,
         recent_reports=recent_reports,
         validated_reports=validated_reports
@@ -156,13 +251,20 @@ def dashboard():
 
 
 def simple_ai_validator(report_data):
-    description = report_data.get('description', '').lower()
+    description = report_data.get('description') or ''
+    # Too little text to judge; leave it for manual review
+    if len(description) < 10:
+        return {
+            'validation_status': 'pending',
+            'validation_notes': 'Too short for validation.',
+            'confidence_score': 0.2
+        }
+
     severity = report_data.get('severity', 'medium').lower()
-    suspicious_keywords = ['fake', 'false', 'spam', 'test', 'dummy']
-    if any(word in description for word in suspicious_keywords):
+    if _SUSPICIOUS_RE.search(description):
         status = 'flagged'
         notes = 'Contains suspicious keywords.'
-    elif severity in ['high', 'critical']:
+    elif severity in _AUTO_VALIDATE_SEVERITIES:
         status = 'auto_validated'
         notes = 'High severity auto-validated.'
     else:
@@ -176,9 +278,11 @@ def simple_ai_validator(report_data):
     }
 
 
-# Temporarily bypass login and mock current_user for testing
 @app.route('/submit-report', methods=['POST'])
+@login_required
 def submit_report():
+    # Every error path returns to the form
+    report_url = url_for('report')
     try:
         title = request.form.get('title')
         description = request.form.get('description')
@@ -191,33 +295,22 @@ def submit_report():
 
         if not all([title, description, incident_type, incident_date_str]):
             flash('Please fill in all required fields.', 'error')
-            return redirect(url_for('report'))
+            return redirect(report_url)
 
         try:
             if not isinstance(incident_date_str, str) or not incident_date_str:
                 raise ValueError("No date string provided")
-            incident_date = datetime.strptime(incident_date_str, '%Y-%m-%d')
+            incident_date = parse_incident_date(incident_date_str)
         except ValueError:
             flash('Invalid date format.', 'error')
-            return redirect(url_for('report'))
+            return redirect(report_url)
 
         photo_filename = None
-        if 'photo' in request.files:
-            file = request.files['photo']
-            if file and file.filename and allowed_file(file.filename):
-                file_ext = file.filename.rsplit('.', 1)[1].lower()
-                photo_filename = f"{uuid.uuid4()}.{file_ext}"
-
-                os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], photo_filename)
-                file.save(file_path)
-
-        # Mock current_user for testing
-        class MockUser:
-            id = 1
-
-        global current_user
-        current_user = MockUser()
+        # Only multipart bodies can carry a photo
+        file = request.files.get('photo') if request.mimetype == 'multipart/form-data' else None
+        file_ext = upload_extension(file.filename) if file and file.filename else None
+        if file_ext:
+            photo_filename = save_upload(file, file_ext)
 
         report = Report()
         report.title = title
@@ -254,61 +347,124 @@ def submit_report():
     except Exception as e:
         app.logger.error(f"Error submitting report: {str(e)}")
         flash('An error occurred while submitting your report. Please try again.', 'error')
-        return redirect(url_for('report'))
+        return redirect(report_url)
+
+
+def set_api_reports_cache_headers(response, etag):
+    # Let browsers and proxies reuse the payload briefly, then revalidate by ETag
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 30
 
 
 @app.route('/api/reports')
 def api_reports():
-    reports = Report.query.all()
-    reports_data = []
-
-    for report in reports:
-        reports_data.append({
-            'id': report.id,
-            'title': report.title,
-            'incident_type': report.incident_type,
-            'severity': report.severity,
-            'status': report.status,
-            'latitude': report.latitude,
-            'longitude': report.longitude,
-            'location_name': report.location_name,
-            'created_at': report.created_at.isoformat(),
-            'reporter': report.reporter.username if report.reporter else 'Unknown',
-            'validation_notes': report.validation_notes
-        })
-
-    return jsonify(reports_data)
-
-
-# Temporarily bypass login and mock current_user for testing
-@app.route('/ai-insights')
-def ai_insights():
-    # Mock current_user for testing
-    class MockUser:
-        user_type = 'authority'
+    # Fingerprint the table so polling clients get a 304 until something changes
+    count, last_id, last_updated = db.session.execute(
+        select(func.count(Report.id), func.max(Report.id), func.max(Report.updated_at))
+    ).one()
+    etag = f"{count}-{last_id}-{last_updated.isoformat() if last_updated else ''}"
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        set_api_reports_cache_headers(response, etag)
+        return response
+
+    # Optional ?limit=&offset= paging; without a limit every report is returned
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    # Select only the serialized columns and join the reporter in the same
+    # query instead of hydrating every Report and lazy-loading its user.
+    query = db.session.query(
+        Report.id,
+        Report.title,
+        Report.incident_type,
+        Report.severity,
+        Report.status,
+        Report.latitude,
+        Report.longitude,
+        Report.location_name,
+        Report.created_at,
+        User.username,
+        Report.validation_notes
+    ).outerjoin(User, User.id == Report.user_id).order_by(Report.id)
+    if limit is not None:
+        query = query.limit(max(limit, 0))
+    if offset > 0:
+        query = query.offset(offset)
+    rows = query.yield_per(500)
+
+    # Stream the array in chunks so neither the ORM rows nor the full JSON
+    # document are ever held in memory at once.
+    def generate():
+        chunk = [b'[']
+        for index, (report_id, title, incident_type, severity, status, latitude, longitude,
+                    location_name, created_at, username, validation_notes) in enumerate(rows):
+            if index:
+                chunk.append(b',')
+            # orjson serializes datetimes natively, so created_at needs no isoformat()
+            chunk.append(orjson.dumps({
+                'id': report_id,
+                'title': title,
+                'incident_type': incident_type,
+                'severity': severity,
+                'status': status,
+                'latitude': latitude,
+                'longitude': longitude,
+                'location_name': location_name,
+                'created_at': created_at,
+                'reporter': username or 'Unknown',
+                'validation_notes': validation_notes
+            }))
+            if len(chunk) >= 1000:
+                yield b''.join(chunk)
+                chunk.clear()
+        chunk.append(b']')
+        yield b''.join(chunk)
+
+    response = app.response_class(stream_with_context(generate()), mimetype='application/json')
+    set_api_reports_cache_headers(response, etag)
+    return response
 
-    global current_user
-    current_user = MockUser()
 
+@app.route('/ai-insights')
+@login_required
+def ai_insights():
     if current_user.user_type != 'authority':
         flash('Access denied. Authority privileges required.', 'error')
         return redirect(url_for('dashboard'))
 
-    flagged_reports = Report.query.filter_by(status='flagged').all()
-    validated_reports = Report.query.filter_by(status='auto_validated').all()
-    pending_reports = Report.query.filter_by(status='pending').all()
-
-    total_reports = Report.query.count()
-    auto_validated = len(validated_reports)
-    flagged_count = len(flagged_reports)
+    # Counts come from one GROUP BY; only the rows actually rendered are fetched
+    status_counts = dict(
+        db.session.execute(select(Report.status, func.count(Report.id)).group_by(Report.status)).all()
+    )
+    total_reports = sum(status_counts.values())
+    auto_validated = status_counts.get('auto_validated', 0)
+    flagged_count = status_counts.get('flagged', 0)
+
+    # Newest 50 flagged and 10 validated/pending reports, in a single round trip
+    ranked = db.session.query(
+        Report.id,
+        func.row_number().over(partition_by=Report.status, order_by=Report.created_at.desc()).label('rank')
+    ).filter(Report.status.in_(('flagged', 'auto_validated', 'pending'))).subquery()
+    rows = Report.query.join(ranked, Report.id == ranked.c.id).filter(
+        ranked.c.rank <= case((Report.status == 'flagged', 50), else_=10)
+    ).order_by(Report.created_at.desc()).all()
+
+    buckets = {'flagged': [], 'auto_validated': [], 'pending': []}
+    for report in rows:
+        buckets[report.status].append(report)
+    flagged_reports = buckets['flagged']
+    validated_reports = buckets['auto_validated']
+    pending_reports = buckets['pending']
 
     ai_efficiency = (auto_validated / total_reports * 100) if total_reports > 0 else 0
 
     return render_template(
         'ai_insights.html',
         flagged_reports=flagged_reports,
-        validated_reports=validated_reports[:10],
-        pending_reports=pending_reports[:10],
+        validated_reports=validated_reports,
+        pending_reports=pending_reports,
         ai_efficiency=round(ai_efficiency, 1),
         total_reports=total_reports,
         auto_validated=auto_validated,
@@ -318,37 +474,20 @@ def ai_insights():
 
 @app.route('/debug')
 def debug():
-    users = User.query.all()
-    reports = Report.query.all()
-
-    html = f"""
-    <h2>Database Debug - Replit</h2>
-    <p><strong>Total Users:</strong> {len(users)}</p>
-    <p><strong>Total Reports:</strong> {len(reports)}</p>
-
-    <h3>Users:</h3>
-    <ul>
-    """
-
-    for user in users:
-        html += f"<li>{user.username} - {user.email} - {user.user_type}</li>"
-
-    html += """
-    </ul>
-    <h3>Reports with AI Analysis:</h3>
-    <ul>
-    """
-
-    for report in reports:
-        html += f"""<li>
-        <strong>{report.title}</strong> - {report.incident_type} - 
-        Status: <strong>{report.status}</strong> - 
-        By: {report.reporter.username}<br>
-        <small>AI Notes: {report.validation_notes or 'None'}</small>
-        </li><br>"""
-
-    html += "</ul><br><a href='/'>Back to Home</a>"
-    return html
+    # Counts come from SQL so the row lists can be iterated lazily while the
+    # template streams out
+    user_count = db.session.execute(select(func.count(User.id))).scalar()
+    report_count = db.session.execute(select(func.count(Report.id))).scalar()
+    users = User.query.yield_per(500)
+    reports = Report.query.options(joinedload(Report.reporter)).yield_per(500)
+
+    return stream_template(
+        'debug.html',
+        users=users,
+        reports=reports,
+        user_count=user_count,
+        report_count=report_count
+    )
 
 
 @app.errorhandler(404)